@@ -0,0 +1,143 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Memory used by bound preference groups
+
+Simulates requests that look up the user preferences and read a value from
+a nested group, and reports the memory allocated per request as well as the
+memory retained by every bound group and default group.
+
+Run it with ``python benchmarks/bench_memory.py``.
+"""
+import gc
+import tracemalloc
+
+import zope.component
+import zope.component.hooks
+import zope.component.testing
+import zope.interface
+import zope.schema
+import zope.security.management
+from zope.annotation.interfaces import IAnnotations
+from zope.interface.interfaces import IComponentLookup
+from zope.site.site import SiteManagerAdapter
+
+from zope.preference import default
+from zope.preference import interfaces
+from zope.preference import preference
+
+
+REQUESTS = 2000
+
+
+class ISettings(zope.interface.Interface):
+
+    skin = zope.schema.Choice(
+        title="Skin",
+        values=['Rotterdam', 'Basic'],
+        default='Rotterdam')
+
+    showLogo = zope.schema.Bool(
+        title="Show Logo",
+        default=True)
+
+
+class Principal:
+
+    def __init__(self, id):
+        self.id = id
+
+
+class Participation:
+
+    interaction = None
+
+    def __init__(self, principal):
+        self.principal = principal
+
+
+_annotations = {}
+
+
+@zope.interface.implementer(IAnnotations)
+def principalAnnotations(principal, context):
+    return _annotations.setdefault(principal.id, {})
+
+
+def setUp():
+    zope.component.testing.setUp()
+    zope.component.hooks.setHooks()
+    zope.component.provideAdapter(
+        SiteManagerAdapter, (zope.interface.Interface,), IComponentLookup)
+    zope.component.provideAdapter(
+        principalAnnotations,
+        (Principal, zope.interface.Interface), IAnnotations)
+    ids = ['', 'a', 'a.b', 'a.b.c', 'a.b.c.d']
+    for id in ids:
+        group = preference.PreferenceGroup(
+            id, schema=ISettings if id else None, title=id,
+            isCategory=id == 'a')
+        zope.component.provideUtility(
+            group, interfaces.IPreferenceGroup, name=id)
+    zope.security.management.newInteraction(
+        Participation(Principal('zope.user')))
+
+
+def tearDown():
+    zope.security.management.endInteraction()
+    zope.component.testing.tearDown()
+
+
+def request():
+    group = preference.UserPreferences().a.b.c.d
+    group.skin
+    # Return the leaf group, which keeps the whole bound chain alive.
+    return group
+
+
+def measure(func, count):
+    """Return the bytes allocated per call at peak and retained per result."""
+    gc.collect()
+    tracemalloc.start()
+    func()
+    base = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    func()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    results = [func() for _i in range(count)]
+    retained = (tracemalloc.get_traced_memory()[0] - base) / count
+    tracemalloc.stop()
+    del results
+    return peak, retained
+
+
+def main():
+    setUp()
+    try:
+        group = zope.component.getUtility(interfaces.IPreferenceGroup, 'a.b')
+        provider = default.DefaultPreferenceProvider()
+        print('%-36s %10s %10s' % ('', 'peak', 'retained'))
+        for title, func in [
+                ('request (UserPreferences().a.b.c.d)', request),
+                ('PreferenceGroup.__bind__', lambda: group.__bind__(None)),
+                ('DefaultPreferenceGroup',
+                 lambda: default.DefaultPreferenceGroup(group, provider)),
+        ]:
+            peak, retained = measure(func, REQUESTS)
+            print('%-36s %10.0f %10.0f' % (title, peak, retained))
+    finally:
+        tearDown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Cost of traversing the ``++preferences++`` namespace
+
+Simulates requests (for example rendering a page template) that traverse
+to several preferences of a deeply nested group and reports the time spent
+per path.
+
+Run it with ``python benchmarks/bench_traversal.py``.
+"""
+import time
+
+import zope.component
+import zope.interface
+import zope.traversing.interfaces
+from bench_memory import setUp
+from bench_memory import tearDown
+from zope.container.interfaces import ISimpleReadContainer
+from zope.container.traversal import ContainerTraversable
+from zope.publisher.browser import TestRequest
+from zope.traversing.api import traverse
+from zope.traversing.testing import setUp as traversalSetUp
+
+from zope.preference import preference
+
+
+PATHS = [
+    '++preferences++/a/skin',
+    '++preferences++/a/b/c/skin',
+    '++preferences++/a/b/c/d/skin',
+    '++preferences++/a/b/c/d/showLogo',
+]
+
+NUMBER = 200
+
+
+def setUpTraversal():
+    traversalSetUp()
+    zope.component.provideAdapter(
+        ContainerTraversable, (ISimpleReadContainer,),
+        zope.traversing.interfaces.ITraversable)
+    zope.component.provideAdapter(
+        preference.preferencesNamespace,
+        (zope.interface.Interface, zope.interface.Interface),
+        zope.traversing.interfaces.ITraversable, 'preferences')
+
+
+class Context:
+    pass
+
+
+def measure(paths, repeat):
+    """Return the time per path when traversing ``repeat`` times a request."""
+    timings = []
+    for _i in range(5):
+        requests = [TestRequest() for _i in range(NUMBER)]
+        start = time.perf_counter()
+        for request in requests:
+            context = Context()
+            for _j in range(repeat):
+                for path in paths:
+                    traverse(context, path, request=request)
+        timings.append(time.perf_counter() - start)
+    return min(timings) / (NUMBER * repeat * len(paths))
+
+
+def main():
+    setUp()
+    setUpTraversal()
+    try:
+        print('%-36s %12s' % ('', 'us per path'))
+        for title, paths, repeat in [
+                ('1 request, 1 path (a/b/c/d/skin)', PATHS[2:3], 1),
+                ('1 request, 4 paths', PATHS, 1),
+                ('1 request, 4 paths x 10', PATHS, 10),
+        ]:
+            print('%-36s %12.1f' % (title, measure(paths, repeat) * 1e6))
+    finally:
+        tearDown()
+
+
+if __name__ == '__main__':
+    main()
@@ -50,17 +50,24 @@ def DefaultPreferences(context, request):
 class DefaultPreferenceGroup(preference.PreferenceGroup):
     """A preference group representing the site-wide default values."""
 
+    __slots__ = ('provider',)
+
     def __init__(self, group, provider):
-        self.provider = provider
-        super().__init__(
-            group.__id__, group.__schema__,
-            group.__title__, group.__description__)
+        # Share the info of the actual group instead of creating a new one.
+        self._setup(group._info)
+        object.__setattr__(self, 'provider', provider)
 
         # Make sure that we also mark the default group as category if the
         # actual group is one; this is important for the UI.
-        if interfaces.IPreferenceCategory.providedBy(group):
+        if interfaces.IPreferenceCategory.providedBy(group) and \
+                not interfaces.IPreferenceCategory.providedBy(self):
             zope.interface.alsoProvides(self, interfaces.IPreferenceCategory)
 
+    def __bind__(self, parent):
+        clone = super().__bind__(parent)
+        object.__setattr__(clone, 'provider', self.provider)
+        return clone
+
     def get(self, key, default=None):
         group = super().get(key, default)
         if group is default:
@@ -72,40 +79,21 @@ class DefaultPreferenceGroup(preference.PreferenceGroup):
             (id, DefaultPreferenceGroup(group, self.provider).__bind__(self))
             for id, group in super(DefaultPreferenceGroup, self).items()]
 
-    def __getattr__(self, key):
-        # Try to find a sub-group of the given id
-        group = self.get(key)
-        if group is not None:
-            return group
-
-        # Try to find a preference of the given name
-        if self.__schema__ and key in self.__schema__:
-            marker = object()
-            value = self.data.get(key, marker)
-            if value is not marker:
-                return value
-
-            # There is currently no local entry, so let's go to the next
-            # provider and lookup the group and value there.
-            nextProvider = zope.component.queryNextUtility(
-                self.provider, interfaces.IDefaultPreferenceProvider)
-
-            # No more providers found, so return the schema's default
-            if nextProvider is None:
-                return self.__schema__[key].default
-
-            nextGroup = nextProvider.getDefaultPreferenceGroup(self.__id__)
-            return getattr(nextGroup, key, self.__schema__[key].default)
+    def _getDefault(self, field):
+        # There is currently no local entry, so let's go to the next
+        # provider and lookup the group and value there.
+        nextProvider = zope.component.queryNextUtility(
+            self.provider, interfaces.IDefaultPreferenceProvider)
 
-        # Nothing found, raise an attribute error
-        raise AttributeError("'%s' is not a preference or sub-group." % key)
+        # No more providers found, so return the schema's default
+        if nextProvider is None:
+            return field.default
 
-    @property
-    def data(self):
-        if self.__id__ not in self.provider.data:
-            self.provider.data[self.__id__] = OOBTree()
+        nextGroup = nextProvider.getDefaultPreferenceGroup(self.__id__)
+        return getattr(nextGroup, field.name, field.default)
 
-        return self.provider.data[self.__id__]
+    def _getStorage(self):
+        return self.provider.data
 
 
 defineChecker(DefaultPreferenceGroup, preference.PreferenceGroupChecker)
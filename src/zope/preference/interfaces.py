@@ -57,6 +57,13 @@ class IPreferenceGroup(ILocation):
         description="The description of the group used in the UI.",
         required=False)
 
+    def __reset__():
+        """Reset the group and all its sub-groups to the default values.
+
+        All values stored for the group and its sub-groups are removed, so
+        that the default values are used again.
+        """
+
 
 class IPreferenceCategory(zope.interface.Interface):
     """A collection of preference groups.
@@ -23,8 +23,10 @@ from zope.preference.preference import PreferenceGroup
 
 
 def preferenceGroup(_context, id=None, schema=None,
-                    title='', description='', category=False):
+                    title='', description='', category=False,
+                    storeDefaults=True):
     if id is None:
         id = ''
-    group = PreferenceGroup(id, schema, title, description, category)
+    group = PreferenceGroup(id, schema, title, description, category,
+                            storeDefaults)
     utility(_context, IPreferenceGroup, group, name=id)
@@ -63,3 +63,12 @@ class IPreferenceGroupDirective(Interface):
         required=False,
         default=False
     )
+
+    storeDefaults = fields.Bool(
+        title="Store Default Values",
+        description="Denotes whether values equal to the default are stored. "
+                    "If false, assigning the default removes the value, so "
+                    "that later changes of the default are picked up.",
+        required=False,
+        default=True
+    )
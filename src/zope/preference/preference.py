@@ -15,16 +15,24 @@
 
 """
 __docformat__ = "reStructuredText"
+import weakref
+
 import zope.component
 import zope.component.hooks
 import zope.interface
 from BTrees.OOBTree import OOBTree
 from zope.annotation.interfaces import IAnnotations
 from zope.container.interfaces import IReadContainer
-from zope.location import Location
-from zope.schema import getFields
+from zope.interface.declarations import ClassProvides
+from zope.interface.declarations import Provides
+from zope.schema import getFieldsInOrder
+from zope.schema.interfaces import IChoice
+from zope.schema.interfaces import IContextSourceBinder
+from zope.schema.interfaces import IPassword
 from zope.security.checker import Checker
 from zope.security.checker import CheckerPublic
+from zope.security.interfaces import ForbiddenAttribute
+from zope.security.interfaces import INameBasedChecker
 from zope.security.management import getInteraction
 from zope.traversing.interfaces import IContainmentRoot
 
@@ -35,60 +43,274 @@ from zope.preference.interfaces import IPreferenceGroup
 
 pref_key = 'zope.app.user.UserPreferences'
 
+traversal_key = 'zope.preference.traversal'
+
+_marker = object()
+
+# The slots of preference groups. They are not set before the group is set
+# up, for example while the group is copied.
+_groupSlots = frozenset(('_info', '_PreferenceGroup__parent', '_name',
+                         '_provides', '_attrs', '_children'))
+
+
+def _isContextFree(field):
+    """Check whether validating the field does not depend on its context.
+
+    Only the fields of ``zope.schema`` are known well enough; choices using
+    named vocabularies or source binders and passwords need the context.
+    """
+    if not type(field).__module__.startswith('zope.schema.'):
+        return False
+    if IPassword.providedBy(field):
+        return False
+    if IChoice.providedBy(field) and (
+            field.vocabularyName is not None or
+            IContextSourceBinder.providedBy(field.vocabulary)):
+        return False
+    for subfield in (getattr(field, 'key_type', None),
+                     getattr(field, 'value_type', None)):
+        if subfield is not None and not _isContextFree(subfield):
+            return False
+    return True
+
+
+class PreferenceField:
+    """A field of a preference group schema.
+
+    The data needed to look up and validate a preference is computed once
+    when the field is created.
+    """
+
+    __slots__ = ('name', 'field', '_default', '_validator')
+
+    def __init__(self, name, field):
+        self.name = name
+        self.field = field
+        # Defaults created by a factory might change, so do not store them.
+        self._default = field.default if field.defaultFactory is None \
+            else _marker
+        # Fields not depending on a context do not need to be bound.
+        self._validator = field if _isContextFree(field) else None
+
+    @property
+    def default(self):
+        if self._default is _marker:
+            return self.field.default
+        return self._default
+
+    def validate(self, group, value):
+        """Validate the value for the given preference group."""
+        validator = self._validator
+        if validator is None:
+            validator = self.field.bind(group)
+        validator.validate(value)
+
+
+def getPreferenceFields(schema):
+    """Return a mapping of names to ``PreferenceField`` for the schema."""
+    if schema is None:
+        return {}
+    return {name: PreferenceField(name, field)
+            for name, field in getFieldsInOrder(schema)}
+
+
+class PreferenceGroupInfo:
+    """The metadata of a preference group.
+
+    One info object is created for every registered preference group and is
+    shared by all the bound copies of the group, so that binding a group does
+    not need to copy any of its metadata.
+    """
+
+    __slots__ = ('id', 'schema', 'title', 'description', 'name',
+                 'interfaces', 'storeDefaults', 'fields', 'checker',
+                 '_specs')
+
+    def __init__(self, id, schema=None, title='', description='',
+                 interfaces=(), storeDefaults=True):
+        self.id = id
+        self.schema = schema
+        self.title = title
+        self.description = description
+        # The last part of the id is the name.
+        self.name = id.split('.')[-1]
+        self.interfaces = interfaces
+        self.storeDefaults = storeDefaults
+        self.fields = getPreferenceFields(schema)
+        self.checker = None
+        self._specs = {}
+
+    def provides(self, cls, interfaces=()):
+        """Return the interfaces directly provided by instances of ``cls``.
+
+        Instances directly providing further ``interfaces`` get a declaration
+        of their own, which is cached as well.
+        """
+        key = (cls, interfaces) if interfaces else cls
+        spec = self._specs.get(key)
+        if spec is None:
+            spec = Provides(cls, *(self.interfaces + interfaces))
+            self._specs[key] = spec
+        return spec
+
+    def replace(self, **kw):
+        """Return a copy of the info with the given attributes replaced."""
+        info = self.__class__.__new__(self.__class__)
+        for name in self.__slots__:
+            setattr(info, name, kw.get(name, getattr(self, name)))
+        if 'schema' in kw:
+            info.fields = getPreferenceFields(info.schema)
+        return info
+
+
+class GroupProvides:
+    """The ``__provides__`` descriptor of preference groups.
+
+    Groups do not have a ``__dict__``, so the interfaces they directly
+    provide come from their info unless they were changed for the group. On
+    the class, the usual class declaration is returned.
+    """
+
+    def __init__(self):
+        self._classProvides = weakref.WeakKeyDictionary()
+
+    def __get__(self, inst, cls):
+        if inst is None:
+            provides = self._classProvides.get(cls)
+            if provides is None:
+                provides = ClassProvides(cls, type(cls))
+                self._classProvides[cls] = provides
+            return provides
+        if inst._provides is not None:
+            return inst._provides
+        return inst._info.provides(cls)
+
+    def __set__(self, inst, spec):
+        inst._provides = spec
+
+
+def _infoProperty(name):
+    def get(self):
+        return getattr(self._info, name)
+
+    def set(self, value):
+        # The info is shared, so never modify it in place.
+        self._info = self._info.replace(**{name: value})
+
+    return property(get, set)
+
 
 @zope.interface.implementer(IPreferenceGroup, IReadContainer)
-class PreferenceGroup(Location):
+class PreferenceGroup:
     """A feature-rich ``IPreferenceGroup`` implementation.
 
     This class implements the
     """
 
-    # Declare attributes here, so that they are always available.
-    __id__ = ''
-    __schema__ = None
-    __title__ = None
-    __description__ = None
+    # A group only stores its shared info and its parent. The other slots
+    # are only set when the group was modified after it has been created, or
+    # when the group caches its bound sub-groups during a request.
+    __slots__ = ('_info', '__parent', '_name', '_provides', '_attrs',
+                 '_children')
 
     def __init__(self, id, schema=None, title='', description='',
-                 isCategory=False):
-        self.__id__ = id
-        self.__schema__ = schema
-        self.__title__ = title
-        self.__description__ = description
-
-        # The last part of the id is the name.
-        self.__name__ = id.split('.')[-1]
-
+                 isCategory=False, storeDefaults=True):
         # Make sure this group provides all important interfaces.
         directlyProvided = ()
         if isCategory:
             directlyProvided += (IPreferenceCategory,)
         if schema:
             directlyProvided += (schema,)
-        zope.interface.directlyProvides(self, directlyProvided)
+        self._setup(PreferenceGroupInfo(
+            id, schema, title, description, directlyProvided, storeDefaults))
+
+    def __init_subclass__(cls, **kw):
+        super().__init_subclass__(**kw)
+        # ``zope.interface`` installs a class provides declaration into
+        # classes not having a ``__provides__`` attribute of their own, which
+        # would hide the instance declarations of sub-classes.
+        if '__provides__' not in cls.__dict__:
+            cls.__provides__ = PreferenceGroup.__dict__['__provides__']
+
+    def _setup(self, info, parent=None, name=None, provides=None,
+               attrs=None):
+        setattr_ = object.__setattr__
+        setattr_(self, '_info', info)
+        setattr_(self, '_PreferenceGroup__parent', parent)
+        setattr_(self, '_name', name)
+        setattr_(self, '_provides', provides)
+        setattr_(self, '_attrs', attrs)
+        setattr_(self, '_children', None)
+
+    __id__ = _infoProperty('id')
+    __title__ = _infoProperty('title')
+    __description__ = _infoProperty('description')
+
+    @property
+    def __schema__(self):
+        return self._info.schema
 
-    # Store the actual parent in ``__parent``. Usually we would just override
-    # the property to an actual value during binding, but because we overrode
-    # ``__setattr__`` this is not possible anymore.
-    __parent = None
+    @__schema__.setter
+    def __schema__(self, schema):
+        # If the schema changed, we really need to change the security
+        # checker as well.
+        self._info = self._info.replace(schema=schema, checker=None)
 
+    @property
+    def __name__(self):
+        return self._name if self._name is not None else self._info.name
+
+    @__name__.setter
+    def __name__(self, name):
+        self._name = name
+
+    # Store the actual parent in ``__parent``, so that we can fall back to
+    # the current site for groups that were not bound.
     @property
     def __parent__(self):
         return self.__parent if self.__parent is not None \
             else zope.component.hooks.getSite()
 
+    @__parent__.setter
+    def __parent__(self, parent):
+        self.__parent = parent
+
+    __provides__ = GroupProvides()
+
+    @property
+    def __Security_checker__(self):
+        # The sub-groups are checked when they are accessed, so that the
+        # checker can be shared.
+        info = self._info
+        if info.checker is None:
+            info.checker = SubGroupChecker(Checker(*_getPermissions(self)))
+        return info.checker
+
     def __bind__(self, parent):
         clone = self.__class__.__new__(self.__class__)
-        clone.__dict__.update(self.__dict__)
-        clone.__parent = parent
+        clone._setup(self._info, parent, self._name, self._provides,
+                     dict(self._attrs) if self._attrs is not None else None)
         return clone
 
+    def __copy__(self):
+        return self.__bind__(self.__parent)
+
     def get(self, key, default=None):
+        children = self._children
+        if children is not None and key in children:
+            group = children[key]
+            return default if group is None else group
         id = self.__id__ and self.__id__ + '.' + key or key
-        group = zope.component.queryUtility(IPreferenceGroup, id, default)
-        if group is default:
-            return default
-        return group.__bind__(self)
+        group = zope.component.queryUtility(IPreferenceGroup, id)
+        if group is not None:
+            group = group.__bind__(self)
+        if children is not None:
+            # Also remember names which are not sub-groups, like the names of
+            # preferences. Sub-groups cache their sub-groups as well.
+            if group is not None:
+                object.__setattr__(group, '_children', {})
+            children[key] = group
+        return default if group is None else group
 
     def items(self):
         cutoff = self.__id__ and len(self.__id__) + 1 or 0
@@ -128,53 +350,94 @@ class PreferenceGroup(Location):
         return len(self.items())
 
     def __getattr__(self, key):
+        if key in _groupSlots:
+            raise AttributeError(key)
+
+        # Try to find an arbitrary attribute set on the group
+        attrs = self._attrs
+        if attrs is not None and key in attrs:
+            return attrs[key]
+
         # Try to find a sub-group of the given id
         group = self.get(key)
         if group is not None:
             return group
 
         # Try to find a preference of the given name
-        if self.__schema__ and key in self.__schema__:
-            marker = object()
-            value = self.data.get(key, marker)
-            if value is marker:
-                # Try to find a default preference provider
-                provider = zope.component.queryUtility(
-                    IDefaultPreferenceProvider,
-                    context=self
-                )
-                if provider is None:
-                    return self.__schema__[key].default
-                defaultGroup = provider.getDefaultPreferenceGroup(self.__id__)
-                return getattr(defaultGroup, key)
+        field = self._info.fields.get(key)
+        if field is not None:
+            value = self.data.get(key, _marker)
+            if value is _marker:
+                return self._getDefault(field)
             return value
 
         # Nothing found, raise an attribute error
         raise AttributeError("'%s' is not a preference or sub-group." % key)
 
+    def _getDefault(self, field):
+        """Return the value used for the field if the user did not set one."""
+        # Try to find a default preference provider
+        provider = zope.component.queryUtility(
+            IDefaultPreferenceProvider,
+            context=self
+        )
+        if provider is None:
+            return field.default
+        defaultGroup = provider.getDefaultPreferenceGroup(self.__id__)
+        return getattr(defaultGroup, field.name)
+
     def __setattr__(self, key, value):
-        if self.__schema__ and key in self.__schema__:
+        try:
+            fields = self._info.fields
+        except AttributeError:
+            # The group is not set up yet, for example while it is copied.
+            fields = {}
+        field = fields.get(key)
+        if field is not None:
             # Validate the value
-            bound = self.__schema__[key].bind(self)
-            bound.validate(value)
-            # Assign value
-            self.data[key] = value
+            field.validate(self, value)
+            if not self._info.storeDefaults and \
+                    value == self._getDefault(field):
+                # Do not store the default, so that changes of the default
+                # are picked up. Do not create an entry for the group either.
+                data = self._getStorage().get(self.__id__)
+                if data is not None:
+                    data.pop(key, None)
+            else:
+                # Assign value
+                self.data[key] = value
+        elif hasattr(self.__class__, key):
+            object.__setattr__(self, key, value)
         else:
-            self.__dict__[key] = value
-            # If the schema changed, we really need to change the security
-            # checker as well.
-            if key == '__schema__':
-                checker = PreferenceGroupChecker(self)
-                self.__dict__['__Security_checker__'] = checker
+            # Groups do not have a ``__dict__``, so keep arbitrary attributes
+            # in a dictionary that is only created when needed.
+            if self._attrs is None:
+                self._attrs = {}
+            self._attrs[key] = value
 
     def __delattr__(self, key):
-        if self.__schema__ and key in self.__schema__:
+        if key in self._info.fields:
             del self.data[key]
+        elif self._attrs and key in self._attrs:
+            del self._attrs[key]
         else:
-            del self.__dict__[key]
-
-    @property
-    def data(self):
+            object.__delattr__(self, key)
+
+    def __reset__(self):
+        """Reset the group and all its sub-groups to the default values."""
+        prefs = self._getStorage()
+        if not self.__id__:
+            prefs.clear()
+            return
+        if self.__id__ in prefs:
+            del prefs[self.__id__]
+        # The ids of all sub-groups sort between "<id>." and "<id>/".
+        for id in list(prefs.keys(self.__id__ + '.', self.__id__ + '/',
+                                  excludemax=True)):
+            del prefs[id]
+
+    def _getStorage(self):
+        """Return the mapping of group ids to the stored preferences."""
         # TODO: what if we have multiple participations?
         principal = getInteraction().participations[0].principal
         ann = zope.component.getMultiAdapter((principal, self), IAnnotations)
@@ -182,38 +445,48 @@ class PreferenceGroup(Location):
         # If no preferences exist, create the root preferences object.
         if ann.get(pref_key) is None:
             ann[pref_key] = OOBTree()
-        prefs = ann[pref_key]
+        return ann[pref_key]
+
+    @property
+    def data(self):
+        prefs = self._getStorage()
 
         # If no entry for the group exists, create a new entry.
-        if self.__id__ not in prefs.keys():
+        if self.__id__ not in prefs:
             prefs[self.__id__] = OOBTree()
 
         return prefs[self.__id__]
 
 
-def PreferenceGroupChecker(instance):
-    """A function that generates a custom security checker.
-
-    The attributes available in a preference group are dynamically generated
-    based on the group schema and the available sub-groups. Thus, the
-    permission dictionaries have to be generated at runtime and are unique for
-    each preference group instance.
-    """
+def _getPermissions(instance):
+    """Return the read and write permissions not depending on sub-groups."""
     read_perm_dict = {}
     write_perm_dict = {}
 
     # Make sure that the attributes from IPreferenceGroup and IReadContainer
     # are public.
     for attrName in ('__id__', '__schema__', '__title__', '__description__',
-                     'get', 'items', 'keys', 'values',
+                     '__reset__', 'get', 'items', 'keys', 'values',
                      '__getitem__', '__contains__', '__iter__', '__len__'):
         read_perm_dict[attrName] = CheckerPublic
 
     # Make the attributes generated from the schema available as well.
-    if instance.__schema__ is not None:
-        for name in getFields(instance.__schema__):
-            read_perm_dict[name] = CheckerPublic
-            write_perm_dict[name] = CheckerPublic
+    for name in instance._info.fields:
+        read_perm_dict[name] = CheckerPublic
+        write_perm_dict[name] = CheckerPublic
+
+    return read_perm_dict, write_perm_dict
+
+
+def PreferenceGroupChecker(instance):
+    """A function that generates a custom security checker.
+
+    The attributes available in a preference group are dynamically generated
+    based on the group schema and the available sub-groups. Thus, the
+    permission dictionaries have to be generated at runtime and are unique for
+    each preference group instance.
+    """
+    read_perm_dict, write_perm_dict = _getPermissions(instance)
 
     # Make all sub-groups available as well.
     for name in instance.keys():
@@ -223,26 +496,87 @@ def PreferenceGroupChecker(instance):
     return Checker(read_perm_dict, write_perm_dict)
 
 
-def UserPreferences(context=None):
-    """Adapts an ``ILocation`` object to the ``IUserPreferences`` interface."""
-    if context is None:
-        context = zope.component.getSiteManager()
+@zope.interface.implementer(INameBasedChecker)
+class SubGroupChecker:
+    """A security checker making the sub-groups of a group available.
+
+    The sub-groups depend on the registered groups and on the site, so they
+    are looked up when they are accessed. All other attributes are checked by
+    the wrapped checker, which can be shared by all bound copies of a group.
+    """
+
+    def __init__(self, checker):
+        self.checker = checker
+
+    def _isSubGroup(self, object, name):
+        return '.' not in name and object.get(name) is not None
+
+    def check_getattr(self, object, name):
+        try:
+            self.checker.check_getattr(object, name)
+        except ForbiddenAttribute:
+            if not self._isSubGroup(object, name):
+                raise
+
+    def check_setattr(self, object, name):
+        try:
+            self.checker.check_setattr(object, name)
+        except ForbiddenAttribute:
+            if not self._isSubGroup(object, name):
+                raise
+
+    def check(self, object, name):
+        self.checker.check(object, name)
+
+    def proxy(self, value):
+        return self.checker.proxy(value)
+
+    def permission_id(self, name):
+        return self.checker.permission_id(name)
+
+    def setattr_permission_id(self, name):
+        return self.checker.setattr_permission_id(name)
+
+
+def _bindRootGroup(context):
+    """Bind the root preference group to the context."""
     rootGroup = zope.component.getUtility(IPreferenceGroup)
     rootGroup = rootGroup.__bind__(context)
     rootGroup.__name__ = '++preferences++'
-    zope.interface.alsoProvides(rootGroup, IContainmentRoot)
+    if rootGroup._provides is None:
+        # Use the declaration precomputed for root groups.
+        rootGroup.__provides__ = rootGroup._info.provides(
+            rootGroup.__class__, (IContainmentRoot,))
+    else:
+        zope.interface.alsoProvides(rootGroup, IContainmentRoot)
     return rootGroup
 
 
+def UserPreferences(context=None):
+    """Adapts an ``ILocation`` object to the ``IUserPreferences`` interface."""
+    if context is None:
+        context = zope.component.getSiteManager()
+    return _bindRootGroup(context)
+
+
 class preferencesNamespace:
     """Used to traverse to the root preferences group."""
 
     def __init__(self, ob, request=None):
         self.context = ob
+        self.request = request
 
     def traverse(self, name, ignore):
-        rootGroup = zope.component.getUtility(IPreferenceGroup)
-        rootGroup = rootGroup.__bind__(self.context)
-        rootGroup.__name__ = '++preferences++'
-        zope.interface.alsoProvides(rootGroup, IContainmentRoot)
+        if self.request is None:
+            rootGroup = _bindRootGroup(self.context)
+        else:
+            # Reuse the root group of the context during the request. It
+            # caches the sub-groups traversed to, so that every path is only
+            # resolved once.
+            roots = self.request.annotations.setdefault(traversal_key, {})
+            context, rootGroup = roots.get(id(self.context), (None, None))
+            if context is not self.context:
+                rootGroup = _bindRootGroup(self.context)
+                object.__setattr__(rootGroup, '_children', {})
+                roots[id(self.context)] = (self.context, rootGroup)
         return name and rootGroup[name] or rootGroup
@@ -13,16 +13,23 @@
 ##############################################################################
 """Tests for the Preferences System
 """
+import copy
 import doctest
 import unittest
 
 import zope.component.hooks
 import zope.component.testing
+import zope.interface
+import zope.schema
 import zope.testing.module
 from zope.interface.verify import verifyObject
+from zope.security.checker import CheckerPublic
+from zope.security.interfaces import ForbiddenAttribute
 from zope.testing import cleanup
 
+import zope.preference
 from zope import component
+from zope.preference.interfaces import IPreferenceCategory
 from zope.preference.interfaces import IPreferenceGroup
 
 
@@ -92,6 +99,407 @@ class TestConfiguration(cleanup.CleanUp,
         self.assertIsInstance(prefs, DefaultPreferenceGroup)
 
 
+class ISettings(zope.interface.Interface):
+
+    skin = zope.schema.TextLine(
+        title="Skin",
+        default="Basic")
+
+
+class TestPreferenceGroup(cleanup.CleanUp,
+                          unittest.TestCase):
+
+    def _makeOne(self, id='group', schema=ISettings, **kw):
+        from zope.preference.preference import PreferenceGroup
+        group = PreferenceGroup(id, schema, **kw)
+        component.provideUtility(group, IPreferenceGroup, name=id)
+        return group
+
+    def test_bound_groups_share_info(self):
+        group = self._makeOne(title='Group', isCategory=True)
+        bound = group.__bind__(self)
+        self.assertIs(bound._info, group._info)
+        self.assertIs(bound.__parent__, self)
+        self.assertIs(bound.__Security_checker__, group.__Security_checker__)
+        self.assertEqual(bound.__name__, 'group')
+        self.assertEqual(bound.__title__, 'Group')
+        self.assertFalse(hasattr(bound, '__dict__'))
+        self.assertTrue(ISettings.providedBy(bound))
+        self.assertTrue(IPreferenceCategory.providedBy(bound))
+
+    def test_modifying_metadata_does_not_modify_shared_info(self):
+        group = self._makeOne(title='Group')
+        bound = group.__bind__(None)
+        bound.__title__ = 'Bound'
+        bound.__name__ = 'bound'
+        self.assertEqual(bound.__title__, 'Bound')
+        self.assertEqual(bound.__name__, 'bound')
+        self.assertEqual(group.__title__, 'Group')
+        self.assertEqual(group.__name__, 'group')
+
+    def test_modifying_schema_updates_checker(self):
+        group = self._makeOne(schema=None)
+        bound = group.__bind__(None)
+        bound.__schema__ = ISettings
+        self.assertEqual(
+            bound.__Security_checker__.setattr_permission_id('skin'),
+            CheckerPublic)
+        self.assertIsNone(
+            group.__Security_checker__.setattr_permission_id('skin'))
+
+    def test_arbitrary_attributes(self):
+        group = self._makeOne()
+        group.foo = 1
+        group.bar = 2
+        bound = group.__bind__(None)
+        bound.foo = 3
+        self.assertEqual((group.foo, group.bar), (1, 2))
+        self.assertEqual((bound.foo, bound.bar), (3, 2))
+        with self.assertRaises(AttributeError):
+            del bound.baz
+
+    def test_arbitrary_attributes_after_deleting_all(self):
+        group = self._makeOne()
+        group.foo = 1
+        del group.foo
+        bound = group.__bind__(None)
+        bound.bar = 2
+        self.assertFalse(hasattr(group, 'bar'))
+        clone = copy.copy(group)
+        clone.baz = 3
+        self.assertFalse(hasattr(group, 'baz'))
+
+    def test_copy(self):
+        from zope.preference.default import DefaultPreferenceGroup
+        from zope.preference.default import DefaultPreferenceProvider
+        group = self._makeOne(title='Group')
+        group.foo = 1
+        bound = group.__bind__(self)
+        clone = copy.copy(bound)
+        self.assertIsNot(clone, bound)
+        self.assertIs(clone._info, group._info)
+        self.assertIs(clone.__parent__, self)
+        self.assertEqual(clone.foo, 1)
+        clone.foo = 2
+        self.assertEqual(bound.foo, 1)
+        self.assertTrue(ISettings.providedBy(clone))
+        default = DefaultPreferenceGroup(group, DefaultPreferenceProvider())
+        clone = copy.copy(default)
+        self.assertIs(clone.provider, default.provider)
+        self.assertEqual(clone.__title__, 'Group')
+
+    def test_slots_not_set_up(self):
+        from zope.preference.default import DefaultPreferenceGroup
+        group = DefaultPreferenceGroup.__new__(DefaultPreferenceGroup)
+        self.assertFalse(hasattr(group, '_info'))
+        self.assertFalse(hasattr(group, '_attrs'))
+        # This is how groups are restored by ``copyreg``.
+        group.provider = None
+        group._info = self._makeOne()._info
+        self.assertIsNone(group.provider)
+        self.assertEqual(group.__id__, 'group')
+
+    def test_class_provides(self):
+        from zope.interface import directlyProvidedBy
+        from zope.interface import providedBy
+        from zope.interface.declarations import ClassProvides
+
+        from zope.preference.default import DefaultPreferenceGroup
+        from zope.preference.preference import GroupProvides
+        from zope.preference.preference import PreferenceGroup
+
+        class Group(PreferenceGroup):
+            pass
+
+        class OwnProvidesGroup(PreferenceGroup):
+            __provides__ = GroupProvides()
+
+        for cls in (PreferenceGroup, DefaultPreferenceGroup, Group,
+                    OwnProvidesGroup):
+            self.assertEqual(list(directlyProvidedBy(cls)), [])
+            self.assertIsInstance(providedBy(cls), ClassProvides)
+            self.assertIs(providedBy(cls), cls.__provides__)
+            self.assertFalse(IPreferenceGroup.providedBy(cls))
+            self.assertTrue(IPreferenceGroup.implementedBy(cls))
+
+        for cls in (Group, OwnProvidesGroup):
+            group = cls('group', ISettings, isCategory=True)
+            self.assertEqual(list(directlyProvidedBy(group)),
+                             [IPreferenceCategory, ISettings])
+            self.assertTrue(IPreferenceGroup.providedBy(group))
+            zope.interface.noLongerProvides(group, IPreferenceCategory)
+            self.assertEqual(list(directlyProvidedBy(group)), [ISettings])
+            self.assertEqual(
+                list(directlyProvidedBy(group.__bind__(None))), [ISettings])
+
+    def test_proxied_default_group_sub_groups(self):
+        from zope.security.checker import ProxyFactory
+
+        from zope.preference.default import DefaultPreferenceProvider
+        self._makeOne('', schema=None)
+        self._makeOne('a')
+        self._makeOne('a.b')
+        provider = DefaultPreferenceProvider()
+        root = ProxyFactory(provider.getDefaultPreferenceGroup(''))
+        self.assertEqual(root.a.__id__, 'a')
+        self.assertEqual(root.a.b.__id__, 'a.b')
+        root.a.b.skin = 'Proxied'
+        self.assertEqual(root.a.b.skin, 'Proxied')
+
+    def test_proxied_default_group_sub_groups_registered_later(self):
+        from zope.security.checker import ProxyFactory
+
+        from zope.preference.default import DefaultPreferenceProvider
+        self._makeOne('', schema=None)
+        self._makeOne('a')
+        provider = DefaultPreferenceProvider()
+        root = ProxyFactory(provider.getDefaultPreferenceGroup(''))
+        self.assertEqual(root.a.__id__, 'a')
+        with self.assertRaises(ForbiddenAttribute):
+            root.b
+        self._makeOne('b')
+        root = ProxyFactory(provider.getDefaultPreferenceGroup(''))
+        self.assertEqual(root.b.__id__, 'b')
+
+    def test_sub_group_checker(self):
+        from zope.security.checker import ProxyFactory
+        root = self._makeOne('', schema=None)
+        self._makeOne('a')
+        self._makeOne('a.b')
+        checker = root.__Security_checker__
+        self.assertIs(checker, root.__bind__(None).__Security_checker__)
+        self.assertIs(checker.permission_id('__id__'), CheckerPublic)
+        self.assertIsNone(checker.permission_id('a'))
+        self.assertIsNone(checker.setattr_permission_id('__id__'))
+        checker.check_getattr(root, 'a')
+        checker.check_setattr(root, 'a')
+        checker.check(root, '__len__')
+        for method in (checker.check_getattr, checker.check_setattr,
+                       checker.check):
+            with self.assertRaises(ForbiddenAttribute):
+                method(root, 'a.b')
+        with self.assertRaises(ForbiddenAttribute):
+            checker.check_getattr(root, 'data')
+        with self.assertRaises(ForbiddenAttribute):
+            checker.check_setattr(root, '__id__')
+        proxy = checker.proxy(root)
+        self.assertIsNot(proxy, root)
+        self.assertEqual(ProxyFactory(proxy).a.b.__id__, 'a.b')
+
+    def test_default_group_shares_info(self):
+        from zope.preference.default import DefaultPreferenceGroup
+        from zope.preference.default import DefaultPreferenceProvider
+        group = self._makeOne(isCategory=True)
+        sub = self._makeOne('group.sub')
+        provider = DefaultPreferenceProvider()
+        default = DefaultPreferenceGroup(group, provider)
+        self.assertIs(default._info, group._info)
+        verifyObject(IPreferenceGroup, default)
+        self.assertTrue(IPreferenceCategory.providedBy(default))
+        self.assertTrue(ISettings.providedBy(default))
+        [(name, subDefault)] = default.items()
+        self.assertEqual(name, 'sub')
+        self.assertIs(subDefault._info, sub._info)
+        self.assertIs(subDefault.provider, provider)
+        self.assertIs(subDefault.__parent__, default)
+
+
+class TestDefaultStorage(cleanup.CleanUp,
+                         unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        from zope.interface.interfaces import IComponentLookup
+        from zope.site.site import SiteManagerAdapter
+        component.provideAdapter(SiteManagerAdapter,
+                                 (zope.interface.Interface,),
+                                 IComponentLookup)
+
+    def _getDefaultGroup(self, id, storeDefaults=True):
+        from zope.preference.default import DefaultPreferenceProvider
+        from zope.preference.preference import PreferenceGroup
+        for groupId in ('', 'group', 'group.sub', 'groupie'):
+            group = PreferenceGroup(
+                groupId, ISettings if groupId else None,
+                storeDefaults=storeDefaults)
+            component.provideUtility(group, IPreferenceGroup, name=groupId)
+        self.provider = DefaultPreferenceProvider()
+        return self.provider.getDefaultPreferenceGroup(id)
+
+    def test_store_defaults(self):
+        group = self._getDefaultGroup('group')
+        group.skin = 'Basic'
+        self.assertEqual(dict(group.data), {'skin': 'Basic'})
+
+    def test_do_not_store_defaults(self):
+        group = self._getDefaultGroup('group', storeDefaults=False)
+        group.skin = 'Rotterdam'
+        self.assertEqual(dict(group.data), {'skin': 'Rotterdam'})
+        group.skin = 'Basic'
+        self.assertEqual(dict(group.data), {})
+
+    def test_do_not_store_defaults_for_untouched_group(self):
+        group = self._getDefaultGroup('group', storeDefaults=False)
+        group.skin = 'Basic'
+        self.assertEqual(list(self.provider.data), [])
+        self.assertEqual(group.skin, 'Basic')
+
+    def test_reset(self):
+        root = self._getDefaultGroup('')
+        root.group.skin = 'Sub'
+        root.group.sub.skin = 'SubSub'
+        root.groupie.skin = 'Other'
+        root.group.__reset__()
+        self.assertEqual(list(self.provider.data), ['groupie'])
+        self.assertEqual(root.group.skin, 'Basic')
+        self.assertEqual(root.group.sub.skin, 'Basic')
+        self.assertEqual(root.groupie.skin, 'Other')
+        # Sub-groups are reset even if the group itself has no entry.
+        root.group.sub.skin = 'SubSub'
+        del self.provider.data['group']
+        root.group.__reset__()
+        self.assertEqual(list(self.provider.data), ['groupie'])
+        root.__reset__()
+        self.assertEqual(list(self.provider.data), [])
+        self.assertEqual(root.groupie.skin, 'Basic')
+
+    def test_configure(self):
+        from zope.configuration import xmlconfig
+        context = xmlconfig.file('meta.zcml', zope.preference)
+        xmlconfig.string("""
+        <configure xmlns="http://namespaces.zope.org/zope"
+                   i18n_domain="test">
+            <preferenceGroup
+                id="group"
+                title="Group"
+                schema="zope.preference.tests.ISettings"
+                storeDefaults="false"
+                />
+        </configure>
+        """, context)
+        group = component.getUtility(IPreferenceGroup, name='group')
+        self.assertFalse(group._info.storeDefaults)
+
+
+class TestTraversal(cleanup.CleanUp,
+                    unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        from zope.preference.preference import PreferenceGroup
+        for id in ('', 'group', 'group.sub'):
+            group = PreferenceGroup(id, ISettings if id else None)
+            component.provideUtility(group, IPreferenceGroup, name=id)
+
+    def _traverse(self, context, name, request=None):
+        from zope.preference.preference import preferencesNamespace
+        return preferencesNamespace(context, request).traverse(name, [])
+
+    def test_root_group(self):
+        from zope.traversing.interfaces import IContainmentRoot
+        root = self._traverse(self, '')
+        self.assertEqual(root.__name__, '++preferences++')
+        self.assertIs(root.__parent__, self)
+        self.assertTrue(IContainmentRoot.providedBy(root))
+        self.assertIs(root.__provides__, self._traverse(self, '').__provides__)
+
+    def test_root_group_providing_interfaces(self):
+        from zope.traversing.interfaces import IContainmentRoot
+        group = component.getUtility(IPreferenceGroup)
+        zope.interface.alsoProvides(group, IPreferenceCategory)
+        root = self._traverse(self, '')
+        self.assertTrue(IContainmentRoot.providedBy(root))
+        self.assertTrue(IPreferenceCategory.providedBy(root))
+        self.assertFalse(IContainmentRoot.providedBy(group))
+
+    def test_no_caching_without_request(self):
+        self.assertIsNot(self._traverse(self, 'group'),
+                         self._traverse(self, 'group'))
+
+    def test_caching_during_request(self):
+        from zope.publisher.browser import TestRequest
+        request = TestRequest()
+        group = self._traverse(self, 'group', request)
+        self.assertIs(self._traverse(self, 'group', request), group)
+        self.assertIs(group.sub, group['sub'])
+        self.assertIsNone(group.get('skin'))
+        self.assertEqual(group.get('skin', 1), 1)
+        # Other contexts and requests have their own groups.
+        other = self._traverse(object(), 'group', request)
+        self.assertIsNot(other, group)
+        self.assertIsNot(self._traverse(self, 'group', TestRequest()), group)
+
+
+class TestPreferenceFields(unittest.TestCase):
+
+    def _getFields(self, schema):
+        from zope.preference.preference import getPreferenceFields
+        return getPreferenceFields(schema)
+
+    def test_no_schema(self):
+        self.assertEqual(self._getFields(None), {})
+
+    def test_fields(self):
+        class ISchema(zope.interface.Interface):
+            name = zope.schema.TextLine(title="Name", default="n")
+            size = zope.schema.Int(title="Size", required=False)
+
+            def method():
+                """Not a field."""
+
+        fields = self._getFields(ISchema)
+        self.assertEqual(list(fields), ['name', 'size'])
+        self.assertIs(fields['name'].field, ISchema['name'])
+        self.assertEqual(fields['name'].default, 'n')
+        fields['size'].validate(None, None)
+        with self.assertRaises(zope.schema.ValidationError):
+            fields['name'].validate(None, 1)
+
+    def test_default_factory(self):
+        values = iter(range(2))
+
+        class ISchema(zope.interface.Interface):
+            count = zope.schema.Int(defaultFactory=lambda: next(values))
+
+        field = self._getFields(ISchema)['count']
+        self.assertEqual((field.default, field.default), (0, 1))
+
+    def test_context_dependent_fields_are_bound(self):
+        from zope.schema.interfaces import IContextSourceBinder
+        from zope.schema.vocabulary import SimpleVocabulary
+
+        @zope.interface.provider(IContextSourceBinder)
+        def source(context):
+            return SimpleVocabulary.fromValues([context.value])
+
+        class TextLine(zope.schema.TextLine):
+            pass
+
+        class ISchema(zope.interface.Interface):
+            text = zope.schema.TextLine()
+            values = zope.schema.List(
+                value_type=zope.schema.Choice(values=[1, 2]))
+            named = zope.schema.Choice(vocabulary='named')
+            sourced = zope.schema.Choice(source=source)
+            sourcedList = zope.schema.List(
+                value_type=zope.schema.Choice(source=source))
+            password = zope.schema.Password()
+            custom = TextLine()
+
+        fields = self._getFields(ISchema)
+        self.assertEqual(
+            [name for name, field in fields.items()
+             if field._validator is None],
+            ['named', 'sourced', 'sourcedList', 'password', 'custom'])
+
+        class Group:
+            value = 1
+
+        fields['sourced'].validate(Group(), 1)
+        with self.assertRaises(zope.schema.ValidationError):
+            fields['sourcedList'].validate(Group(), [2])
+
+
 def test_suite():
     readme = doctest.DocFileSuite(
         'README.rst',